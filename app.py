@@ -8,412 +8,425 @@ This application allows family members to:
 - Admin can manage family members pool and run Secret Santa assignments
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response
-from functools import wraps
+from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response, g
+from collections import namedtuple
+from functools import lru_cache, wraps
+from jinja2 import FileSystemBytecodeCache
 from markupsafe import Markup, escape
+from werkzeug.security import check_password_hash, generate_password_hash
+import atexit
+import hmac
+import json
+import queue
 import random
 import sqlite3
 import os
-from datetime import date, datetime
+from datetime import date
+from types import MappingProxyType
 
 app = Flask(__name__)
 # WARNING: Without SECRET_KEY set, a new random key is generated on every restart,
 # invalidating all user sessions. Set SECRET_KEY in your environment or .env file.
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
 
+# Optional server-side sessions: with REDIS_URL set (e.g. redis://localhost:6379/0
+# or unix:///var/run/redis/redis.sock) sessions are stored in Redis and the
+# cookie only carries a session id. Requires Flask-Session and redis.
+# Without it, Flask's default signed cookie session is used.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    import redis
+    from flask_session import Session
+
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.Redis.from_url(REDIS_URL),
+        SESSION_PERMANENT=False,
+    )
+    Session(app)
+
 SUPPORTED_LANGUAGES = {'en': 'English', 'de': 'Deutsch', 'ru': 'Русский'}
 
-TRANSLATIONS = {
-    'en': {
-        'title': 'Family Christmas Wish List',
-        'header': '🎄 Family Christmas Wish List 🎅',
-        'admin': '⚙️ Admin',
-        'logout': 'Logout',
-        'back_to_wishlist': '← Back to My Wishlist',
-        'change_language': '🌐 Language',
-        'language_popup_title': 'Choose Your Language',
-        'language_popup_desc': 'Please select your preferred language:',
-        'confirm_language': 'Confirm',
-        'who_are_you': 'Who Are You?',
-        'select_name': 'Select your name(s) to see your personal wishlist.',
-        'select_members': '🎁 Select your family member name(s):',
-        'team_restriction_hint': 'Tip: Once you select a member from a team, only other members of the same team can be added.',
-        'different_team_error': 'You can only select members from the same team.',
-        'view_wishlist': '🎅 View My Wishlist',
-        'no_members': 'No family members in the pool yet. Please ask the admin to add family members first! 👨‍👩‍👧‍👦',
-        'please_select': 'Please select at least one family member.',
-        'my_wishlist': '🎁 My Wishlist',
-        'viewing_as': 'Viewing as:',
-        'secret_santa': 'Secret Santa:',
-        'buys_for': '→ buys for',
-        'no_assignments': 'No Secret Santa assignments yet. Ask the admin to run Secret Santa!',
-        'wishes_closed': 'The wish list is now closed.',
-        'deadline_was': 'The deadline was',
-        'no_new_wishes': 'No new wishes can be added — the list is read-only.',
-        'add_wish': 'Add a Wish',
-        'add_wish_desc': 'You can add a wish for yourself or on behalf of another family member. Wishes added for other members will not be visible to you (except your Secret Santa receiver\'s wishes shown below).',
-        'for_label': 'For:',
-        'select_name_opt': 'Select a name',
-        'you_suffix': '(you)',
-        'wish_required': 'Wish (required):',
-        'product_link_label': 'Product Link (optional):',
-        'add_wish_btn': 'Add Wish',
-        'your_wishes': 'Your Wishes',
-        'wishes_label': '\'s Wishes',
-        'no_wishes_for': 'No wishes added yet for',
-        'buying_for': 'You Are Buying For',
-        'buying_for_icon': '🛍️',
-        'delete': 'Delete',
-        'delete_wish_confirm': 'Are you sure you want to delete this wish?',
-        'progress_label': 'users have already chosen a wish',
-        'days_left': 'days left until deadline',
-        'deadline_passed': 'Deadline has passed',
-        'no_deadline': 'No deadline set',
-        'comments': '💬 Comments',
-        'add_comment': 'Add a Comment',
-        'comment_text': 'Comment:',
-        'your_name_label': 'Your name (optional, leave blank for anonymous):',
-        'post_comment': 'Post Comment',
-        'anonymous': 'Anonymous',
-        'no_comments': 'No comments yet. Be the first to comment!',
-        'admin_title': 'Admin - Manage Family Members',
-        'wish_deadline_section': '📅 Wish Deadline',
-        'deadline_desc': 'After this date, the wish list becomes read-only and no new wishes can be added. Leave blank to allow wishes at any time.',
-        'deadline_inclusive': 'Deadline date (inclusive):',
-        'save_deadline': 'Save Deadline',
-        'current_deadline': 'Current deadline:',
-        'no_deadline_set': 'No deadline set — wishes can be added at any time.',
-        'add_member': 'Add Family Member',
-        'member_name': 'Family Member Name:',
-        'team_optional': 'Team (optional, e.g. "Team A"):',
-        'no_team': 'Leave blank if no team',
-        'add_member_btn': 'Add Member',
-        'family_pool': 'Family Members Pool',
-        'no_members_yet': 'No family members yet. Add the first one above! 👨‍👩‍👧‍👦',
-        'name_col': 'Name',
-        'team_col': 'Team',
-        'actions_col': 'Actions',
-        'update_btn': 'Update',
-        'secret_santa_admin': '🎅 Secret Santa Assignments',
-        'run_ss': 'Run Secret Santa',
-        'run_ss_confirm': 'This will overwrite existing Secret Santa assignments. Continue?',
-        'giver': 'Giver',
-        'receiver': '→ Buys for',
-        'no_ss': 'No Secret Santa assignments yet. Click "Run Secret Santa" to generate them.',
-        'all_wishes': '📋 All Wishes',
-        'person_col': 'Person',
-        'wish_col': 'Wish',
-        'product_col': 'Product Link',
-        'view_product': 'View Product',
-        'no_wishes_admin': 'No wishes added yet.',
-        'reset_section': '🔄 Reset',
-        'reset_btn': 'Reset All Wishes, Assignments & Comments',
-        'reset_confirm': 'This will delete ALL wishes, ALL Secret Santa assignments, and ALL comments. Are you sure?',
-        'reset_desc': 'This will delete all wishes, reset the Secret Santa assignments, and delete all comments.',
-        'delete_member_confirm': 'Are you sure? This will also delete all wishes for',
-    },
-    'de': {
-        'title': 'Familien Weihnachts-Wunschliste',
-        'header': '🎄 Familien Weihnachts-Wunschliste 🎅',
-        'admin': '⚙️ Admin',
-        'logout': 'Abmelden',
-        'back_to_wishlist': '← Zurück zur Wunschliste',
-        'change_language': '🌐 Sprache',
-        'language_popup_title': 'Sprache wählen',
-        'language_popup_desc': 'Bitte wähle deine bevorzugte Sprache:',
-        'confirm_language': 'Bestätigen',
-        'who_are_you': 'Wer bist du?',
-        'select_name': 'Wähle deinen Namen, um deine persönliche Wunschliste zu sehen.',
-        'select_members': '🎁 Wähle deinen Familiennamen:',
-        'team_restriction_hint': 'Tipp: Sobald du ein Mitglied eines Teams auswählst, können nur weitere Mitglieder desselben Teams hinzugefügt werden.',
-        'different_team_error': 'Du kannst nur Mitglieder desselben Teams auswählen.',
-        'view_wishlist': '🎅 Meine Wunschliste anzeigen',
-        'no_members': 'Noch keine Familienmitglieder. Bitte den Admin, Familienmitglieder hinzuzufügen! 👨‍👩‍👧‍👦',
-        'please_select': 'Bitte wähle mindestens ein Familienmitglied aus.',
-        'my_wishlist': '🎁 Meine Wunschliste',
-        'viewing_as': 'Angemeldet als:',
-        'secret_santa': 'Wichteln:',
-        'buys_for': '→ kauft für',
-        'no_assignments': 'Noch keine Wichtel-Zuteilung. Bitte den Admin, das Wichteln zu starten!',
-        'wishes_closed': 'Die Wunschliste ist jetzt geschlossen.',
-        'deadline_was': 'Der Einsendeschluss war',
-        'no_new_wishes': 'Es können keine neuen Wünsche hinzugefügt werden — die Liste ist schreibgeschützt.',
-        'add_wish': 'Wunsch hinzufügen',
-        'add_wish_desc': 'Du kannst einen Wunsch für dich oder stellvertretend für ein anderes Familienmitglied hinzufügen.',
-        'for_label': 'Für:',
-        'select_name_opt': 'Name auswählen',
-        'you_suffix': '(du)',
-        'wish_required': 'Wunsch (erforderlich):',
-        'product_link_label': 'Produktlink (optional):',
-        'add_wish_btn': 'Wunsch hinzufügen',
-        'your_wishes': 'Deine Wünsche',
-        'wishes_label': 's Wünsche',
-        'no_wishes_for': 'Noch keine Wünsche für',
-        'buying_for': 'Du kaufst für',
-        'buying_for_icon': '🛍️',
-        'delete': 'Löschen',
-        'delete_wish_confirm': 'Möchtest du diesen Wunsch wirklich löschen?',
-        'progress_label': 'Nutzer haben bereits einen Wunsch eingetragen',
-        'days_left': 'Tage bis zum Einsendeschluss',
-        'deadline_passed': 'Einsendeschluss ist vorbei',
-        'no_deadline': 'Kein Einsendeschluss gesetzt',
-        'comments': '💬 Kommentare',
-        'add_comment': 'Kommentar hinzufügen',
-        'comment_text': 'Kommentar:',
-        'your_name_label': 'Dein Name (optional, leer lassen für anonym):',
-        'post_comment': 'Kommentar posten',
-        'anonymous': 'Anonym',
-        'no_comments': 'Noch keine Kommentare. Sei der Erste!',
-        'admin_title': 'Admin - Familienmitglieder verwalten',
-        'wish_deadline_section': '📅 Einsendeschluss',
-        'deadline_desc': 'Nach diesem Datum wird die Wunschliste schreibgeschützt und es können keine neuen Wünsche hinzugefügt werden.',
-        'deadline_inclusive': 'Einsendeschluss (inklusive):',
-        'save_deadline': 'Einsendeschluss speichern',
-        'current_deadline': 'Aktueller Einsendeschluss:',
-        'no_deadline_set': 'Kein Einsendeschluss — Wünsche können jederzeit hinzugefügt werden.',
-        'add_member': 'Familienmitglied hinzufügen',
-        'member_name': 'Name des Familienmitglieds:',
-        'team_optional': 'Team (optional, z.B. "Team A"):',
-        'no_team': 'Leer lassen, wenn kein Team',
-        'add_member_btn': 'Mitglied hinzufügen',
-        'family_pool': 'Familienmitglieder Pool',
-        'no_members_yet': 'Noch keine Familienmitglieder. Füge das erste oben hinzu! 👨‍👩‍👧‍👦',
-        'name_col': 'Name',
-        'team_col': 'Team',
-        'actions_col': 'Aktionen',
-        'update_btn': 'Aktualisieren',
-        'secret_santa_admin': '🎅 Wichtel-Zuteilung',
-        'run_ss': 'Wichteln starten',
-        'run_ss_confirm': 'Dies wird bestehende Wichtel-Zuteilungen überschreiben. Fortfahren?',
-        'giver': 'Geber',
-        'receiver': '→ Kauft für',
-        'no_ss': 'Noch keine Wichtel-Zuteilung. Klicke auf "Wichteln starten".',
-        'all_wishes': '📋 Alle Wünsche',
-        'person_col': 'Person',
-        'wish_col': 'Wunsch',
-        'product_col': 'Produktlink',
-        'view_product': 'Produkt ansehen',
-        'no_wishes_admin': 'Noch keine Wünsche eingetragen.',
-        'reset_section': '🔄 Zurücksetzen',
-        'reset_btn': 'Alle Wünsche, Zuteilungen & Kommentare zurücksetzen',
-        'reset_confirm': 'Hiermit werden ALLE Wünsche, ALLE Wichtel-Zuteilungen und ALLE Kommentare gelöscht. Bist du sicher?',
-        'reset_desc': 'Dies löscht alle Wünsche, setzt die Wichtel-Zuteilungen zurück und löscht alle Kommentare.',
-        'delete_member_confirm': 'Bist du sicher? Dadurch werden auch alle Wünsche für',
-    },
-    'ru': {
-        'title': 'Семейный список пожеланий',
-        'header': '🎄 Семейный список пожеланий 🎅',
-        'admin': '⚙️ Админ',
-        'logout': 'Выйти',
-        'back_to_wishlist': '← Назад к списку',
-        'change_language': '🌐 Язык',
-        'language_popup_title': 'Выбери язык',
-        'language_popup_desc': 'Пожалуйста, выбери предпочтительный язык:',
-        'confirm_language': 'Подтвердить',
-        'who_are_you': 'Кто ты?',
-        'select_name': 'Выбери своё имя, чтобы увидеть свой список пожеланий.',
-        'select_members': '🎁 Выбери своё имя:',
-        'team_restriction_hint': 'Подсказка: Выбрав участника из команды, ты сможешь добавить только других участников той же команды.',
-        'different_team_error': 'Можно выбирать только участников одной команды.',
-        'view_wishlist': '🎅 Посмотреть мой список',
-        'no_members': 'Участников ещё нет. Попроси администратора добавить участников! 👨‍👩‍👧‍👦',
-        'please_select': 'Пожалуйста, выбери хотя бы одного участника.',
-        'my_wishlist': '🎁 Мой список пожеланий',
-        'viewing_as': 'Просмотр как:',
-        'secret_santa': 'Тайный Санта:',
-        'buys_for': '→ покупает для',
-        'no_assignments': 'Жеребьёвка ещё не проведена. Попроси администратора запустить жеребьёвку!',
-        'wishes_closed': 'Список пожеланий закрыт.',
-        'deadline_was': 'Крайний срок был',
-        'no_new_wishes': 'Новые пожелания добавлять нельзя — список только для чтения.',
-        'add_wish': 'Добавить пожелание',
-        'add_wish_desc': 'Ты можешь добавить пожелание для себя или от имени другого участника.',
-        'for_label': 'Для:',
-        'select_name_opt': 'Выбери имя',
-        'you_suffix': '(ты)',
-        'wish_required': 'Пожелание (обязательно):',
-        'product_link_label': 'Ссылка на товар (необязательно):',
-        'add_wish_btn': 'Добавить',
-        'your_wishes': 'Твои пожелания',
-        'wishes_label': ' — пожелания',
-        'no_wishes_for': 'Пожеланий ещё нет для',
-        'buying_for': 'Ты покупаешь для',
-        'buying_for_icon': '🛍️',
-        'delete': 'Удалить',
-        'delete_wish_confirm': 'Ты уверен, что хочешь удалить это пожелание?',
-        'progress_label': 'участников уже добавили пожелание',
-        'days_left': 'дней до крайнего срока',
-        'deadline_passed': 'Срок истёк',
-        'no_deadline': 'Срок не установлен',
-        'comments': '💬 Комментарии',
-        'add_comment': 'Добавить комментарий',
-        'comment_text': 'Комментарий:',
-        'your_name_label': 'Твоё имя (необязательно, оставь пустым для анонима):',
-        'post_comment': 'Опубликовать',
-        'anonymous': 'Аноним',
-        'no_comments': 'Комментариев ещё нет. Будь первым!',
-        'admin_title': 'Админ - Управление участниками',
-        'wish_deadline_section': '📅 Крайний срок',
-        'deadline_desc': 'После этой даты список пожеланий становится доступным только для чтения.',
-        'deadline_inclusive': 'Дата крайнего срока (включительно):',
-        'save_deadline': 'Сохранить срок',
-        'current_deadline': 'Текущий срок:',
-        'no_deadline_set': 'Срок не установлен — пожелания можно добавлять в любое время.',
-        'add_member': 'Добавить участника',
-        'member_name': 'Имя участника:',
-        'team_optional': 'Команда (необязательно, напр. "Команда А"):',
-        'no_team': 'Оставь пустым, если нет команды',
-        'add_member_btn': 'Добавить участника',
-        'family_pool': 'Список участников',
-        'no_members_yet': 'Участников ещё нет. Добавь первого выше! 👨‍👩‍👧‍👦',
-        'name_col': 'Имя',
-        'team_col': 'Команда',
-        'actions_col': 'Действия',
-        'update_btn': 'Обновить',
-        'secret_santa_admin': '🎅 Жеребьёвка Тайного Санты',
-        'run_ss': 'Провести жеребьёвку',
-        'run_ss_confirm': 'Это перезапишет текущую жеребьёвку. Продолжить?',
-        'giver': 'Даритель',
-        'receiver': '→ Покупает для',
-        'no_ss': 'Жеребьёвка ещё не проводилась. Нажми "Провести жеребьёвку".',
-        'all_wishes': '📋 Все пожелания',
-        'person_col': 'Участник',
-        'wish_col': 'Пожелание',
-        'product_col': 'Ссылка на товар',
-        'view_product': 'Смотреть товар',
-        'no_wishes_admin': 'Пожеланий ещё нет.',
-        'reset_section': '🔄 Сброс',
-        'reset_btn': 'Сбросить все пожелания, жеребьёвку и комментарии',
-        'reset_confirm': 'Это удалит ВСЕ пожелания, ВСЮ жеребьёвку и ВСЕ комментарии. Ты уверен?',
-        'reset_desc': 'Удаляет все пожелания, сбрасывает жеребьёвку и удаляет все комментарии.',
-        'delete_member_confirm': 'Ты уверен? Это также удалит все пожелания для',
-    },
-}
+# UI strings per language, one JSON file each under translations/.
+# Read-only views so the shared dicts cannot be modified by accident.
+TRANSLATIONS = {}
+for _lang in SUPPORTED_LANGUAGES:
+    with open(os.path.join(app.root_path, 'translations', f'{_lang}.json'), encoding='utf-8') as _f:
+        TRANSLATIONS[_lang] = MappingProxyType(json.load(_f))
+
+
+_BR = '<br>\n'
 
 
 @app.template_filter('nl2br')
+@lru_cache(maxsize=1024, typed=True)
 def nl2br_filter(value):
     """Convert newlines in text to HTML <br> tags, safely escaping HTML."""
-    return Markup(escape(value).replace('\n', Markup('<br>\n')))
+    # Work on the plain escaped str: one split/join instead of Markup.replace,
+    # which re-escapes its arguments and wraps every intermediate result.
+    # The same wish and comment texts are rendered on every page view, so
+    # results are cached; Markup is immutable and safe to share. typed=True
+    # keeps Markup and str inputs apart: they compare equal for the same
+    # text, but only Markup may pass through unescaped.
+    return Markup(_BR.join(str(escape(value)).split('\n')))
+
+
+# Template context per language, built once instead of on every render
+_CONTEXTS = {
+    lang: {
+        't': TRANSLATIONS[lang],
+        'lang': lang,
+        'supported_languages': SUPPORTED_LANGUAGES,
+    }
+    for lang in SUPPORTED_LANGUAGES
+}
+_SUPPORTED = frozenset(SUPPORTED_LANGUAGES)
 
 
 def get_language():
     """Return current language code from cookie, defaulting to 'en'."""
     lang = request.cookies.get('language', '')
-    return lang if lang in SUPPORTED_LANGUAGES else 'en'
+    return lang if lang in _SUPPORTED else 'en'
+
+
+def translate(key):
+    """Return the translation of key in the current language."""
+    return _CONTEXTS[get_language()]['t'][key]
 
 
 @app.context_processor
 def inject_translations():
     """Inject translation dict and language info into every template."""
-    lang = get_language()
-    return {
-        't': TRANSLATIONS[lang],
-        'lang': lang,
-        'supported_languages': SUPPORTED_LANGUAGES,
-    }
+    return _CONTEXTS[get_language()]
+
+
+# Outside debug mode templates never change at runtime: skip the per-render
+# mtime check and compile the templates once at startup (after the filters
+# above are registered). Compiled bytecode is also kept in a per-user temp
+# directory, so worker processes and restarts skip the Jinja compile step.
+# app.run(debug=True) turns auto-reload back on.
+if not app.debug:
+    app.jinja_env.auto_reload = False
+    app.jinja_env.cache_size = 400
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    for template_name in ('who_are_you.html', 'my_wishlist.html',
+                          'admin_login.html', 'admin_panel.html'):
+        app.jinja_env.get_template(template_name)
+
 
 # Database configuration
 DATABASE = 'wishlist.db'
 
+# Largest value an INTEGER PRIMARY KEY (rowid) can hold
+SQLITE_MAX_ROWID = 2**63 - 1
+
+# Bumped whenever init_db() changes the schema; stored in PRAGMA user_version
+SCHEMA_VERSION = 3
+
+# Idle connections kept open for reuse by later requests
+DB_POOL_SIZE = 4
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
 # Admin credentials — configure via environment variables for production use.
 # Set ADMIN_USERNAME and ADMIN_PASSWORD as environment variables.
 # Defaults below are for local development only.
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
-ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
+# Hashed once at startup; logins are checked with check_password_hash
+ADMIN_PASSWORD_HASH = generate_password_hash(os.environ.get('ADMIN_PASSWORD', 'admin123'))
 
 
 def get_db_connection():
     """
     Create and return a connection to the SQLite database.
     Sets row_factory to sqlite3.Row to access columns by name.
-    """
-    conn = sqlite3.connect(DATABASE)
+    The connection may be reused from another thread via the pool, but is
+    only ever used by one request at a time.
+    """
+    # timeout is SQLite's busy timeout: wait up to 5s for a lock before
+    # raising "database is locked". Pooled connections outlive requests, so a
+    # larger statement cache keeps every query in this file prepared.
+    conn = sqlite3.connect(DATABASE, timeout=5.0, check_same_thread=False,
+                           cached_statements=256)
     conn.row_factory = sqlite3.Row
+    # Per-connection settings; journal_mode is persistent and set in init_db()
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-20000')
+    conn.execute('PRAGMA mmap_size=134217728')
     return conn
 
 
+def get_db():
+    """
+    Return the database connection for the current request.
+    The connection is taken from the pool (or opened if the pool is empty)
+    on first use and handed back in close_db() when the app context is torn
+    down, so every query in a request shares it.
+    """
+    if 'db' not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = get_db_connection()
+    return g.db
+
+
+@app.teardown_appcontext
+def close_db(exception):
+    """Return the request's database connection to the pool, if one was used."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        # Never hand an open transaction to the next request
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _db_pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+@atexit.register
+def close_pooled_connections():
+    """
+    Close the idle pooled connections when the process exits, so SQLite can
+    checkpoint the WAL and release its file handles cleanly.
+    """
+    while True:
+        try:
+            _db_pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
 def init_db():
     """
     Initialize the database if it doesn't exist.
-    Creates the wishes, family_members, and secret_santa tables.
+    Creates the wishes, family_members, and secret_santa tables and their indexes.
+    Returns right away if the database is already at SCHEMA_VERSION, so it is
+    cheap to call from every worker process.
     """
     conn = get_db_connection()
-    
-    # Create family_members table
-    conn.execute('''
+
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        conn.close()
+        return
+
+    # WAL lets readers and a writer proceed concurrently and avoids an fsync
+    # of the rollback journal on every commit. The mode is stored in the
+    # database file, so it only needs to be set once.
+    conn.execute('PRAGMA journal_mode=WAL')
+
+    # Probe the existing schema so that only the needed migrations are run
+    tables = {row['name'] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
+    # Tables from older schemas are moved aside, recreated, and refilled
+    # from the old copy: secret_santa if it does not reference
+    # family_members yet, wishes if it still stores person_name instead of
+    # the member's id
+    legacy_tables = []
+    if 'wishes' in tables:
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(wishes)')}
+        if 'person_id' not in columns:
+            legacy_tables.append('wishes')
+    if ('secret_santa' in tables
+            and not conn.execute('PRAGMA foreign_key_list(secret_santa)').fetchall()):
+        legacy_tables.append('secret_santa')
+
+    # All statements are sent as one script and run in one transaction
+    script = ['BEGIN;']
+    for table in legacy_tables:
+        script.append(f'ALTER TABLE {table} RENAME TO {table}_legacy;')
+    if 'wishes' in legacy_tables:
+        # The index moved with the renamed table; recreate it on the new one
+        script.append('DROP INDEX IF EXISTS idx_wishes_person_id;')
+
+    script.append('''
         CREATE TABLE IF NOT EXISTS family_members (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
             team_name TEXT
-        )
-    ''')
+        );
 
-    # Migration: add team_name column if it doesn't exist yet
-    try:
-        conn.execute('ALTER TABLE family_members ADD COLUMN team_name TEXT')
-        conn.commit()
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    
-    # Create wishes table
-    conn.execute('''
+        -- A member's wishes are removed with the member
         CREATE TABLE IF NOT EXISTS wishes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            person_name TEXT NOT NULL,
+            person_id INTEGER NOT NULL
+                REFERENCES family_members (id) ON DELETE CASCADE,
             wish_text TEXT NOT NULL,
             product_link TEXT,
             reserved INTEGER DEFAULT 0
-        )
-    ''')
+        );
 
-    # Create secret_santa table
-    conn.execute('''
+        -- Assignments involving a deleted member are dropped with them
         CREATE TABLE IF NOT EXISTS secret_santa (
-            giver_name TEXT PRIMARY KEY,
+            giver_name TEXT PRIMARY KEY
+                REFERENCES family_members (name) ON UPDATE CASCADE ON DELETE CASCADE,
             receiver_name TEXT NOT NULL
-        )
-    ''')
+                REFERENCES family_members (name) ON UPDATE CASCADE ON DELETE CASCADE
+        );
 
-    # Create settings table
-    conn.execute('''
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
             value TEXT
-        )
-    ''')
+        );
 
-    # Create comments table
-    conn.execute('''
         CREATE TABLE IF NOT EXISTS comments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             author_name TEXT,
             comment_text TEXT NOT NULL,
             created_at TEXT NOT NULL
-        )
+        );
     ''')
 
-    conn.commit()
+    # Migration: add team_name column if it doesn't exist yet
+    if 'family_members' in tables:
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(family_members)')}
+        if 'team_name' not in columns:
+            script.append('ALTER TABLE family_members ADD COLUMN team_name TEXT;')
+
+    # Rows pointing at members that no longer exist are not carried over
+    if 'wishes' in legacy_tables:
+        script.append('''
+            INSERT INTO wishes (id, person_id, wish_text, product_link, reserved)
+            SELECT w.id, fm.id, w.wish_text, w.product_link, w.reserved
+            FROM wishes_legacy w JOIN family_members fm ON fm.name = w.person_name;
+            DROP TABLE wishes_legacy;
+        ''')
+    if 'secret_santa' in legacy_tables:
+        script.append('''
+            INSERT INTO secret_santa (giver_name, receiver_name)
+            SELECT giver_name, receiver_name FROM secret_santa_legacy
+            WHERE giver_name IN (SELECT name FROM family_members)
+              AND receiver_name IN (SELECT name FROM family_members);
+            DROP TABLE secret_santa_legacy;
+        ''')
+
+    # Index wishes by person, newest first. This serves the per-person
+    # lookups in my_wishlist and the member-by-member listing in admin_panel
+    # without a table scan or a separate sort, and the ON DELETE CASCADE
+    # from family_members. family_members.name and secret_santa.giver_name
+    # are already indexed by their UNIQUE/PRIMARY KEY; receiver_name gets its
+    # own index so renaming or deleting a member finds the assignments it
+    # cascades to without scanning secret_santa.
+    script.append('''
+        CREATE INDEX IF NOT EXISTS idx_wishes_person_id
+        ON wishes (person_id, id DESC);
+        CREATE INDEX IF NOT EXISTS idx_secret_santa_receiver
+        ON secret_santa (receiver_name);
+    ''')
+
+    script.append(f'PRAGMA user_version = {SCHEMA_VERSION};')
+    script.append('COMMIT;')
+    conn.executescript('\n'.join(script))
     conn.close()
 
 
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or migrate the database (run once before starting a WSGI server)."""
+    init_db()
+    print('Database initialized.')
+
+
+def get_settings():
+    """
+    Return all settings as a dict.
+    The settings table is read once per request and cached on flask.g.
+    """
+    if '_settings_cache' not in g:
+        rows = get_db().execute('SELECT key, value FROM settings').fetchall()
+        g._settings_cache = {row['key']: row['value'] for row in rows}
+    return g._settings_cache
+
+
 def get_setting(key, default=None):
     """Return the value for a settings key, or default if not set."""
-    conn = get_db_connection()
-    row = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
-    conn.close()
-    return row['value'] if row else default
+    return get_settings().get(key, default)
 
 
 def set_setting(key, value):
     """Insert or replace a setting key/value pair."""
-    conn = get_db_connection()
+    conn = get_db()
     conn.execute(
         'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
         (key, value)
     )
     conn.commit()
-    conn.close()
+    g.pop('_settings_cache', None)
+
+
+def bump_data_version(conn):
+    """
+    Invalidate cached page data after a write to wishes, family members or
+    Secret Santa assignments. Increments the 'data_version' setting in the caller's transaction, so
+    the change is seen by every worker process once the caller commits.
+    """
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES ('data_version', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+    g.pop('_settings_cache', None)
+
+
+# Wish rows for the template loops: plain attribute access instead of the
+# name lookup sqlite3.Row needs for every 'wish.field' Jinja reads
+Wish = namedtuple('Wish', 'id person_name wish_text product_link reserved')
+
+
+@lru_cache(maxsize=128)
+def load_wishes_by_person(names, data_version):
+    """
+    Return {person_name: (wish, ...)} for the given tuple of names, newest
+    wish first. Results are cached per data_version, which changes on every
+    write to the data (see bump_data_version), so a cached entry is never stale.
+    """
+    placeholders = ','.join(['?'] * len(names))
+    cursor = get_db().cursor()
+    cursor.row_factory = lambda cursor, row: Wish._make(row)
+    wishes = cursor.execute(
+        'SELECT w.id, fm.name, w.wish_text, w.product_link, w.reserved '
+        'FROM family_members fm JOIN wishes w ON w.person_id = fm.id '
+        'WHERE fm.name IN (' + placeholders + ') '
+        'ORDER BY fm.name ASC, w.id DESC',
+        names
+    ).fetchall()
+    wishes_by_person = {name: [] for name in names}
+    for wish in wishes:
+        wishes_by_person[wish.person_name].append(wish)
+    # Tuples, since the cached result is shared between requests
+    return {name: tuple(person_wishes) for name, person_wishes in wishes_by_person.items()}
+
+
+@lru_cache(maxsize=4)
+def load_admin_panel_data(data_version):
+    """
+    Return (family_members, secret_santa, all_wishes) for the admin panel,
+    cached per data_version like load_wishes_by_person().
+    """
+    conn = get_db()
+    # One read transaction so the three lists come from the same snapshot
+    conn.execute('BEGIN')
+    try:
+        family_members = conn.execute(
+            'SELECT * FROM family_members ORDER BY name ASC'
+        ).fetchall()
+        secret_santa = conn.execute(
+            'SELECT * FROM secret_santa ORDER BY giver_name ASC'
+        ).fetchall()
+        all_wishes = conn.execute(
+            'SELECT w.*, fm.name AS person_name '
+            'FROM family_members fm JOIN wishes w ON w.person_id = fm.id '
+            'ORDER BY fm.name ASC, w.id DESC'
+        ).fetchall()
+    finally:
+        conn.commit()
+    return tuple(family_members), tuple(secret_santa), tuple(all_wishes)
+
+
+# Parsed deadline dates keyed by their stored string; cleared by set_deadline
+_deadline_cache = {}
 
 
 def wishes_locked():
@@ -422,11 +435,67 @@ def wishes_locked():
     deadline_str = get_setting('wish_deadline')
     if not deadline_str:
         return False
-    try:
-        deadline = date.fromisoformat(deadline_str)
-        return date.today() > deadline
-    except ValueError:
-        return False
+    deadline = _deadline_cache.get(deadline_str)
+    if deadline is None:
+        try:
+            deadline = date.fromisoformat(deadline_str)
+        except ValueError:
+            return False
+        _deadline_cache[deadline_str] = deadline
+    return date.today() > deadline
+
+
+# Random draws tried before falling back to the constructed circle
+SECRET_SANTA_ATTEMPTS = 200
+
+
+def build_secret_santa_cycle(members):
+    """
+    Arrange members in a random circle where each person gives to the next
+    one (the last gives to the first) and nobody gives to a member of their
+    own team. Members without a team can be paired with anyone.
+    Returns the list of names, or None if one team holds more than half of
+    all members, in which case no valid circle exists.
+
+    The circle is drawn by shuffling until no two teammates sit next to
+    each other, which picks uniformly among all valid circles, so the seat
+    of one teammate says nothing about where the others sit. When valid
+    circles are so rare that SECRET_SANTA_ATTEMPTS shuffles all fail, the
+    circle is built directly instead: members are grouped by team, largest
+    group first, and that sequence is dealt into the even seats and then
+    into the odd ones. As no group is larger than half the circle, two
+    seats holding the same group are never next to each other.
+    """
+    groups = {}
+    for member in members:
+        # Without a team, every member forms a group of their own
+        key = member['team_name'] or ('', member['name'])
+        groups.setdefault(key, []).append(member['name'])
+
+    n = len(members)
+    if max(len(group) for group in groups.values()) > n // 2:
+        return None
+
+    seats = [(member['name'], member['team_name']) for member in members]
+    for _ in range(SECRET_SANTA_ATTEMPTS):
+        random.shuffle(seats)
+        # seats[i - 1] wraps around to the last seat for i == 0
+        if not any(team and team == seats[i - 1][1]
+                   for i, (_, team) in enumerate(seats)):
+            return [name for name, _ in seats]
+
+    groups = list(groups.values())
+    for group in groups:
+        random.shuffle(group)
+    random.shuffle(groups)
+    groups.sort(key=len, reverse=True)  # stable: equal-sized groups stay shuffled
+
+    ordered = [name for group in groups for name in group]
+    half = (n + 1) // 2
+    cycle = [None] * n
+    cycle[0::2] = ordered[:half]
+    cycle[1::2] = ordered[half:]
+    return cycle
 
 
 def login_required(f):
@@ -477,28 +546,22 @@ def add_wish():
 
     # Validate required fields
     if person_name and wish_text:
-        conn = get_db_connection()
-
-        # Check if person is in family members pool
-        member = conn.execute(
-            'SELECT id FROM family_members WHERE name = ?',
-            (person_name,)
-        ).fetchone()
+        conn = get_db()
 
-        if member:
-            conn.execute(
-                'INSERT INTO wishes (person_name, wish_text, product_link) VALUES (?, ?, ?)',
-                (person_name, wish_text, product_link)
-            )
+        # Insert only if the person is in the family members pool
+        cursor = conn.execute(
+            'INSERT INTO wishes (person_id, wish_text, product_link) '
+            'SELECT id, ?, ? FROM family_members WHERE name = ?',
+            (wish_text, product_link, person_name)
+        )
+        if cursor.rowcount == 1:
+            bump_data_version(conn)
             conn.commit()
-
             # If wishing on behalf of another member, show confirmation only
             selected_members = session.get('selected_members', [])
             if person_name not in selected_members:
                 flash(f'🎁 Wish created for {person_name}!', 'success')
 
-        conn.close()
-
     if source == 'my_wishlist':
         return redirect(url_for('my_wishlist'))
     return redirect(url_for('index'))
@@ -510,10 +573,10 @@ def delete_wish(wish_id):
     Delete a wish from the database by its ID.
     """
     source = request.form.get('source', '')
-    conn = get_db_connection()
+    conn = get_db()
     conn.execute('DELETE FROM wishes WHERE id = ?', (wish_id,))
+    bump_data_version(conn)
     conn.commit()
-    conn.close()
     
     if source == 'my_wishlist':
         return redirect(url_for('my_wishlist'))
@@ -527,31 +590,28 @@ def who_are_you():
     Stores selection in session and redirects to personalized wishlist.
     Only members from the same team may be selected together.
     """
-    conn = get_db_connection()
+    conn = get_db()
     family_members = conn.execute(
         "SELECT name, COALESCE(team_name, '') AS team_name FROM family_members ORDER BY team_name, name ASC"
     ).fetchall()
-    conn.close()
 
     if request.method == 'POST':
         selected = request.form.getlist('selected_members')
         if selected:
             # Validate that all selected members belong to the same team
-            conn = get_db_connection()
             placeholders = ','.join(['?'] * len(selected))
-            members_data = conn.execute(
-                'SELECT team_name FROM family_members WHERE name IN (' + placeholders + ')',
+            team_count = conn.execute(
+                "SELECT COUNT(DISTINCT COALESCE(team_name, '')) FROM family_members "
+                'WHERE name IN (' + placeholders + ')',
                 selected
-            ).fetchall()
-            conn.close()
-            teams = set(m['team_name'] for m in members_data)
-            if len(teams) > 1:
+            ).fetchone()[0]
+            if team_count > 1:
                 return render_template('who_are_you.html', family_members=family_members,
-                                       error=TRANSLATIONS[get_language()]['different_team_error'])
+                                       error=translate('different_team_error'))
             session['selected_members'] = selected
             return redirect(url_for('my_wishlist'))
         return render_template('who_are_you.html', family_members=family_members,
-                               error=TRANSLATIONS[get_language()]['please_select'])
+                               error=translate('please_select'))
 
     # If user already has a selection, go straight to the wishlist
     if session.get('selected_members'):
@@ -570,63 +630,48 @@ def my_wishlist():
     if not selected_members:
         return redirect(url_for('who_are_you'))
 
-    conn = get_db_connection()
+    conn = get_db()
 
-    # Validate selected members still exist
-    placeholders = ','.join(['?'] * len(selected_members))
-    query = 'SELECT name FROM family_members WHERE name IN (' + placeholders + ')'
-    valid = conn.execute(query, selected_members).fetchall()
-    valid_names = [r['name'] for r in valid]
+    # One query serves the add-wish dropdown (own + all for impersonation),
+    # the check that the selected members still exist, and their Secret
+    # Santa receivers (NULL if not assigned yet)
+    all_family_members = conn.execute(
+        'SELECT fm.name, ss.receiver_name FROM family_members fm '
+        'LEFT JOIN secret_santa ss ON ss.giver_name = fm.name '
+        'ORDER BY fm.name ASC'
+    ).fetchall()
+    receivers = {m['name']: m['receiver_name'] for m in all_family_members}
+    valid_names = [name for name in selected_members if name in receivers]
     if not valid_names:
         session.pop('selected_members', None)
-        conn.close()
         return redirect(url_for('who_are_you'))
 
-    # Get Secret Santa assignments for selected members
-    assigned_to = {}
-    for name in valid_names:
-        assignment = conn.execute(
-            'SELECT receiver_name FROM secret_santa WHERE giver_name = ?',
-            (name,)
-        ).fetchone()
-        if assignment:
-            assigned_to[name] = assignment['receiver_name']
+    # Secret Santa assignments for selected members
+    assigned_to = {name: receivers[name] for name in valid_names if receivers[name]}
 
     # Build set of all relevant names: own + assigned receivers
     names_to_show = set(valid_names)
     for receiver in assigned_to.values():
         names_to_show.add(receiver)
 
-    # Get all family members for the add-wish dropdown (own + all for impersonation)
-    all_family_members = conn.execute(
-        'SELECT name FROM family_members ORDER BY name ASC'
-    ).fetchall()
-
-    # Get wishes for all relevant people
-    wishes_by_person = {}
-    for person_name in names_to_show:
-        wishes = conn.execute(
-            'SELECT * FROM wishes WHERE person_name = ? ORDER BY id DESC',
-            (person_name,)
-        ).fetchall()
-        wishes_by_person[person_name] = wishes
-
-    conn.close()
+    # Get wishes for all relevant people, grouped by person
+    wishes_by_person = load_wishes_by_person(tuple(sorted(names_to_show)),
+                                             get_setting('data_version', '0'))
 
     locked = wishes_locked()
     wish_deadline = get_setting('wish_deadline')
 
     # Gather comments
-    conn2 = get_db_connection()
-    comments = conn2.execute(
+    comments = conn.execute(
         'SELECT * FROM comments ORDER BY id DESC'
     ).fetchall()
-    # Progress: count distinct members with at least one wish vs total
-    total_members = conn2.execute('SELECT COUNT(*) FROM family_members').fetchone()[0]
-    members_with_wishes = conn2.execute(
-        'SELECT COUNT(DISTINCT person_name) FROM wishes'
+    # Progress: count distinct members with at least one wish vs total.
+    # The total comes from the member list loaded above; the distinct count
+    # is answered from idx_wishes_person_id without touching the table.
+    total_members = len(all_family_members)
+    members_with_wishes = conn.execute(
+        'SELECT COUNT(DISTINCT person_id) FROM wishes'
     ).fetchone()[0]
-    conn2.close()
 
     return render_template('my_wishlist.html',
                            wishes_by_person=wishes_by_person,
@@ -647,10 +692,14 @@ def admin_login():
     Admin login page with basic authentication.
     """
     if request.method == 'POST':
-        username = request.form.get('username')
-        password = request.form.get('password')
+        username = request.form.get('username', '')
+        password = request.form.get('password', '')
         
-        if username == ADMIN_USERNAME and password == ADMIN_PASSWORD:
+        # Both checks always run, so the response time does not reveal
+        # whether the username was right
+        username_ok = hmac.compare_digest(username.encode(), ADMIN_USERNAME.encode())
+        password_ok = check_password_hash(ADMIN_PASSWORD_HASH, password)
+        if username_ok and password_ok:
             session['logged_in'] = True
             return redirect(url_for('admin_panel'))
         else:
@@ -663,7 +712,7 @@ def admin_login():
 def set_language():
     """Set the preferred language via cookie and redirect back."""
     lang = request.form.get('language', 'en')
-    if lang not in SUPPORTED_LANGUAGES:
+    if lang not in _SUPPORTED:
         lang = 'en'
     next_url = request.form.get('next') or request.referrer or url_for('index')
     resp = make_response(redirect(next_url))
@@ -677,13 +726,13 @@ def add_comment():
     comment_text = request.form.get('comment_text', '').strip()
     author_name = request.form.get('author_name', '').strip() or None
     if comment_text:
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute(
-            'INSERT INTO comments (author_name, comment_text, created_at) VALUES (?, ?, ?)',
-            (author_name, comment_text, datetime.utcnow().strftime('%Y-%m-%d %H:%M'))
+            "INSERT INTO comments (author_name, comment_text, created_at) "
+            "VALUES (?, ?, strftime('%Y-%m-%d %H:%M', 'now'))",
+            (author_name, comment_text)
         )
         conn.commit()
-        conn.close()
     return redirect(url_for('my_wishlist'))
 
 
@@ -702,17 +751,8 @@ def admin_panel():
     """
     Admin panel to manage family members pool, Secret Santa, and view all wishes.
     """
-    conn = get_db_connection()
-    family_members = conn.execute(
-        'SELECT * FROM family_members ORDER BY name ASC'
-    ).fetchall()
-    secret_santa = conn.execute(
-        'SELECT * FROM secret_santa ORDER BY giver_name ASC'
-    ).fetchall()
-    all_wishes = conn.execute(
-        'SELECT * FROM wishes ORDER BY person_name ASC, id DESC'
-    ).fetchall()
-    conn.close()
+    family_members, secret_santa, all_wishes = load_admin_panel_data(
+        get_setting('data_version', '0'))
 
     wish_deadline = get_setting('wish_deadline')
 
@@ -728,6 +768,7 @@ def set_deadline():
     Save or clear the wish deadline date.
     """
     deadline = request.form.get('wish_deadline', '').strip()
+    _deadline_cache.clear()
     if deadline:
         set_setting('wish_deadline', deadline)
         flash(f'Wish deadline set to {deadline}.', 'success')
@@ -737,18 +778,48 @@ def set_deadline():
     return redirect(url_for('admin_panel'))
 
 
+@app.route('/admin/delete_wishes', methods=['POST'])
+@login_required
+def delete_wishes():
+    """
+    Delete all wishes checked in the admin panel in one transaction.
+    """
+    # Values that are not integers are skipped by getlist; ids outside
+    # SQLite's rowid range could never match and would overflow the binding
+    wish_ids = [(wish_id,) for wish_id in request.form.getlist('wish_ids', type=int)
+                if 0 < wish_id <= SQLITE_MAX_ROWID]
+    if wish_ids:
+        conn = get_db()
+        cursor = conn.executemany('DELETE FROM wishes WHERE id = ?', wish_ids)
+        bump_data_version(conn)
+        conn.commit()
+        flash(f'Deleted {cursor.rowcount} wish(es).', 'success')
+    return redirect(url_for('admin_panel'))
+
+
 @app.route('/admin/reset', methods=['POST'])
 @login_required
 def admin_reset():
     """
     Reset all wishes, Secret Santa assignments, and comments.
     """
-    conn = get_db_connection()
-    conn.execute('DELETE FROM wishes')
-    conn.execute('DELETE FROM secret_santa')
-    conn.execute('DELETE FROM comments')
-    conn.commit()
-    conn.close()
+    conn = get_db()
+    # SQLite only takes its truncate fast path for an unqualified DELETE when
+    # no foreign key checks apply. These tables are not referenced by any
+    # other table, so clearing them with the checks off is safe. The pragma
+    # is ignored inside a transaction, so it is switched before BEGIN.
+    conn.execute('PRAGMA foreign_keys=OFF')
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM wishes')
+        conn.execute('DELETE FROM secret_santa')
+        conn.execute('DELETE FROM comments')
+        bump_data_version(conn)
+        conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute('PRAGMA foreign_keys=ON')
     flash('All wishes, Secret Santa assignments, and comments have been reset.', 'success')
     return redirect(url_for('admin_panel'))
 
@@ -761,55 +832,34 @@ def run_secret_santa():
     where each person gives to exactly one other person and no one is
     assigned to a member of their own team.
     """
-    conn = get_db_connection()
+    conn = get_db()
     members = conn.execute(
         'SELECT name, team_name FROM family_members ORDER BY name ASC'
     ).fetchall()
-    names = [m['name'] for m in members]
-    teams = {m['name']: m['team_name'] for m in members}
 
-    if len(names) < 2:
+    if len(members) < 2:
         flash('Need at least 2 family members for Secret Santa!', 'error')
-        conn.close()
         return redirect(url_for('admin_panel'))
 
-    # Try to find a valid circular assignment that respects team constraints.
-    # Two members violate the constraint if both have the same non-None team.
-    assignment = None
-    MAX_ATTEMPTS = 200
-    for _ in range(MAX_ATTEMPTS):
-        shuffled = names[:]
-        random.shuffle(shuffled)
-        valid = True
-        for i, giver in enumerate(shuffled):
-            receiver = shuffled[(i + 1) % len(shuffled)]
-            giver_team = teams.get(giver)
-            receiver_team = teams.get(receiver)
-            if giver_team and giver_team == receiver_team:
-                valid = False
-                break
-        if valid:
-            assignment = shuffled
-            break
-
+    assignment = build_secret_santa_cycle(members)
     if assignment is None:
         flash(
             'Could not create a valid Secret Santa assignment with the current team '
             'constraints. Try adding more participants or adjusting team sizes.',
             'error'
         )
-        conn.close()
         return redirect(url_for('admin_panel'))
 
-    conn.execute('DELETE FROM secret_santa')
-    for i, giver in enumerate(assignment):
-        receiver = assignment[(i + 1) % len(assignment)]
-        conn.execute(
+    # Replace the previous assignment in a single transaction
+    pairs = [(giver, assignment[(i + 1) % len(assignment)])
+             for i, giver in enumerate(assignment)]
+    with conn:
+        conn.execute('DELETE FROM secret_santa')
+        conn.executemany(
             'INSERT INTO secret_santa (giver_name, receiver_name) VALUES (?, ?)',
-            (giver, receiver)
+            pairs
         )
-    conn.commit()
-    conn.close()
+        bump_data_version(conn)
     flash('Secret Santa assignments created successfully!', 'success')
     return redirect(url_for('admin_panel'))
 
@@ -824,18 +874,19 @@ def add_family_member():
     team_name = request.form.get('team_name', '').strip() or None
     
     if name:
-        conn = get_db_connection()
-        try:
-            conn.execute(
-                'INSERT INTO family_members (name, team_name) VALUES (?, ?)',
-                (name, team_name)
-            )
+        conn = get_db()
+        cursor = conn.execute(
+            'INSERT INTO family_members (name, team_name) VALUES (?, ?) '
+            'ON CONFLICT(name) DO NOTHING',
+            (name, team_name)
+        )
+        if cursor.rowcount == 1:
+            bump_data_version(conn)
             conn.commit()
             flash(f'Successfully added {name} to the family pool!', 'success')
-        except sqlite3.IntegrityError:
+        else:
             # Name already exists
             flash(f'Error: {name} already exists in the family pool.', 'error')
-        conn.close()
     
     return redirect(url_for('admin_panel'))
 
@@ -845,25 +896,13 @@ def add_family_member():
 def delete_family_member(member_id):
     """
     Delete a family member from the pool.
-    Also deletes all wishes associated with that member.
+    Their wishes and Secret Santa assignments are removed by ON DELETE CASCADE.
     """
-    conn = get_db_connection()
-    
-    # Get the member name first
-    member = conn.execute(
-        'SELECT name FROM family_members WHERE id = ?',
-        (member_id,)
-    ).fetchone()
-    
-    if member:
-        # Delete all wishes for this member
-        conn.execute('DELETE FROM wishes WHERE person_name = ?', (member['name'],))
-        
-        # Delete the member
-        conn.execute('DELETE FROM family_members WHERE id = ?', (member_id,))
-        conn.commit()
+    conn = get_db()
+    conn.execute('DELETE FROM family_members WHERE id = ?', (member_id,))
+    bump_data_version(conn)
+    conn.commit()
     
-    conn.close()
     return redirect(url_for('admin_panel'))
 
 
@@ -872,13 +911,14 @@ def delete_family_member(member_id):
 def edit_family_member(member_id):
     """
     Edit a family member's name and team.
-    Also updates all wishes with the old name to use the new name.
+    Wishes are keyed by member id and need no update; Secret Santa
+    assignments follow the new name via ON UPDATE CASCADE.
     """
     new_name = request.form.get('name')
     team_name = request.form.get('team_name', '').strip() or None
     
     if new_name:
-        conn = get_db_connection()
+        conn = get_db()
         
         # Get the old name
         member = conn.execute(
@@ -889,26 +929,20 @@ def edit_family_member(member_id):
         if member:
             old_name = member['name']
             
-            try:
-                # Update the member name and team
-                conn.execute(
-                    'UPDATE family_members SET name = ?, team_name = ? WHERE id = ?',
-                    (new_name, team_name, member_id)
-                )
-                
-                # Update all wishes with the old name
-                conn.execute(
-                    'UPDATE wishes SET person_name = ? WHERE person_name = ?',
-                    (new_name, old_name)
-                )
-                
+            # Update the member name and team; OR IGNORE skips the row
+            # instead of raising if the new name is taken by another member
+            cursor = conn.execute(
+                'UPDATE OR IGNORE family_members SET name = ?, team_name = ? WHERE id = ?',
+                (new_name, team_name, member_id)
+            )
+            
+            if cursor.rowcount == 1:
+                bump_data_version(conn)
                 conn.commit()
                 flash(f'Successfully updated {old_name} to {new_name}!', 'success')
-            except sqlite3.IntegrityError:
+            else:
                 # Name already exists
                 flash(f'Error: {new_name} already exists in the family pool.', 'error')
-        
-        conn.close()
     
     return redirect(url_for('admin_panel'))
 
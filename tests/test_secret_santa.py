@@ -0,0 +1,75 @@
+"""Tests for the Secret Santa draw in build_secret_santa_cycle()."""
+
+import itertools
+import random
+import unittest
+from collections import Counter
+from unittest import mock
+
+import app
+
+
+def make_members(teams):
+    """Build member rows from a {name: team_name} dict."""
+    return [{'name': name, 'team_name': team} for name, team in teams.items()]
+
+
+def is_valid_cycle(cycle, teams):
+    """True if cycle seats every member once and no giver gets a teammate."""
+    if sorted(cycle) != sorted(teams):
+        return False
+    return not any(teams[giver] and teams[giver] == teams[cycle[i - 1]]
+                   for i, giver in enumerate(cycle))
+
+
+def seat_distance(cycle, a, b):
+    """Number of seats between a and b, the shorter way round."""
+    d = (cycle.index(b) - cycle.index(a)) % len(cycle)
+    return min(d, len(cycle) - d)
+
+
+class BuildSecretSantaCycleTest(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(12345)
+
+    def check_all_layouts(self):
+        """Every team layout of 2 to 7 members with up to 3 teams."""
+        for n in range(2, 8):
+            for labels in itertools.product(range(4), repeat=n):
+                teams = {f'm{i}': f't{label}' if label else None
+                         for i, label in enumerate(labels)}
+                sizes = Counter(team for team in teams.values() if team)
+                feasible = not sizes or max(sizes.values()) <= n // 2
+                cycle = app.build_secret_santa_cycle(make_members(teams))
+                if feasible:
+                    self.assertIsNotNone(cycle, teams)
+                    self.assertTrue(is_valid_cycle(cycle, teams), (teams, cycle))
+                else:
+                    self.assertIsNone(cycle, teams)
+
+    def test_valid_for_every_layout(self):
+        self.check_all_layouts()
+
+    def test_fallback_is_valid_for_every_layout(self):
+        with mock.patch.object(app, 'SECRET_SANTA_ATTEMPTS', 0):
+            self.check_all_layouts()
+
+    def test_teammate_spacing_is_uniform(self):
+        # With a team of 2 and 4 members without a team, 48 of the 72 valid
+        # circles seat the teammates 2 apart and 24 seat them 3 apart. A
+        # draw that always puts them 2 apart tells each teammate who the
+        # other one is buying for.
+        teams = {'Alice': 'x', 'Bob': 'x', 'C': None, 'D': None, 'E': None, 'F': None}
+        members = make_members(teams)
+        draws = 6000
+        spacing = Counter(
+            seat_distance(app.build_secret_santa_cycle(members), 'Alice', 'Bob')
+            for _ in range(draws)
+        )
+        self.assertEqual(set(spacing), {2, 3})
+        self.assertAlmostEqual(spacing[3] / draws, 24 / 72, delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()